@@ -4,24 +4,57 @@
 
 # Standard library imports
 import argparse
+import atexit
 import csv
 import json
 import os
+import queue
 import re
+import shelve
 import subprocess
 import tempfile
+import threading
+import time
 import unicodedata
-from collections import defaultdict
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from datetime import datetime
 
 # Third party imports
 from tqdm import tqdm
+try:
+    import ijson
+except ImportError:
+    ijson = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 OP_CLI_PATH = "/opt/homebrew/bin/op"
 DRY_RUN = True
 ARCHIVE_DOCS = True
 SUPERVISE_RUN = False
 VERBOSE = False
+# How many op subprocesses may be in flight at once for read-only
+# fetches; pools that modify items run at half this. Overridable with
+# --max-workers.
+MAX_WORKERS = 16
+
+# Characters stripped from filenames: the Windows-unsafe set plus all
+# characters below code point 32. Built once so sanitize() can drop them
+# in a single C-level str.translate pass.
+_BLACKLIST_TABLE = str.maketrans({c: None for c in "\\/:*?\"<>|\0"} | {chr(i): None for i in range(32)})
+_PATH_SEP_RE = re.compile(r"/|\\")
+_RESERVED = frozenset({
+    "CON", "PRN", "AUX", "NUL", "COM1", "COM2", "COM3", "COM4", "COM5",
+    "COM6", "COM7", "COM8", "COM9", "LPT1", "LPT2", "LPT3", "LPT4", "LPT5",
+    "LPT6", "LPT7", "LPT8", "LPT9",
+})  # Reserved words on Windows
+# Matches a trailing 1-4 character file extension; a document named
+# "file.ext - whatever.pdf" was not created by the 1P v7 upgrade.
+_FILE_EXT_RE = re.compile(r"\.[^.]{1,4}$")
 
 def sanitize(filename:str) -> str:
     """Return a fairly safe version of the filename.
@@ -32,26 +65,18 @@ def sanitize(filename:str) -> str:
     and make sure we do not exceed Windows filename length limits.
     Hence a less safe blacklist, rather than a whitelist.
     """
-    blacklist = ["\\", "/", ":", "*", "?", "\"", "<", ">", "|", "\0"]
-    reserved = [
-        "CON", "PRN", "AUX", "NUL", "COM1", "COM2", "COM3", "COM4", "COM5",
-        "COM6", "COM7", "COM8", "COM9", "LPT1", "LPT2", "LPT3", "LPT4", "LPT5",
-        "LPT6", "LPT7", "LPT8", "LPT9",
-    ]  # Reserved words on Windows
-    filename = "".join(c for c in filename if c not in blacklist)
-    # Remove all charcters below code point 32
-    filename = "".join(c for c in filename if 31 < ord(c))
+    filename = filename.translate(_BLACKLIST_TABLE)
     filename = unicodedata.normalize("NFKD", filename)
     filename = filename.rstrip(". ")  # Windows does not allow these at end
     filename = filename.strip()
-    if all([x == "." for x in filename]):
+    if filename != "" and filename.strip(".") == "":
         filename = "__" + filename
-    if filename in reserved:
+    if filename in _RESERVED:
         filename = "__" + filename
     if len(filename) == 0:
         filename = "__"
     if len(filename) > 255:
-        parts = re.split(r"/|\\", filename)[-1].split(".")
+        parts = _PATH_SEP_RE.split(filename)[-1].split(".")
         if len(parts) > 1:
             ext = "." + parts.pop()
             filename = filename[:-len(ext)]
@@ -70,50 +95,410 @@ def sanitize(filename:str) -> str:
             filename = "__"
     return filename
 
-def R(cmd:str) -> bytes:
+_OP_ENV = None
+_OP_ENV_LOCK = threading.Lock()
+
+def op_env() -> dict:
+    """
+    Return the environment to run op commands with, signing in once and
+    caching the session token. The op CLI re-resolves the account (and
+    possibly prompts for auth) on every invocation unless an OP_SESSION_*
+    variable is present, which adds hundreds of milliseconds per call.
+    Signing in a single time up front amortizes that cost across the
+    thousands of op calls a run can make. If signin fails (e.g. the
+    desktop-app integration is handling auth), fall back to the
+    unmodified environment.
+    """
+    global _OP_ENV
+    with _OP_ENV_LOCK:
+        if _OP_ENV is None:
+            env = dict(os.environ)
+            # a service-account token or a Connect server already gives op
+            # non-interactive (and lower-latency) auth on every call, so
+            # don't waste a subprocess attempting an interactive signin
+            preauthed = ("OP_SERVICE_ACCOUNT_TOKEN" in env or "OP_CONNECT_HOST" in env
+                         or any(k.startswith("OP_SESSION_") for k in env))
+            if not preauthed:
+                try:
+                    token = subprocess.run([OP_CLI_PATH, "signin", "--raw"], check=True, capture_output=True).stdout.decode("utf-8").strip()
+                    account = subprocess.run([OP_CLI_PATH, "account", "list", "--format=json"], check=True, capture_output=True).stdout
+                    shorthand = json.loads(account)[0].get("shorthand", "") if account else ""
+                    if token != "" and shorthand != "":
+                        env[f"OP_SESSION_{shorthand}"] = token
+                except (subprocess.CalledProcessError, IndexError, json.JSONDecodeError):
+                    pass
+            _OP_ENV = env
+    return _OP_ENV
+
+# stderr fragments that mark failures no retry can fix; matching calls
+# raise immediately instead of burning the retry budget. Unknown
+# flag/command errors matter for the version probes (--include-files,
+# --categories), which are designed to fail cheaply on older op releases.
+_PERMANENT_ERRORS = (b"isn't an item", b"isn't a vault", b"no such vault", b"authentication required", b"doesn't exist", b"unknown flag", b"unknown command", b"unknown shorthand flag")
+# how long one call may spend retrying in total, in seconds
+_RETRY_BUDGET = 3.0
+
+def R(args:list) -> bytes:
     """
-    Execute a command using the subprocess.run method and return the output as a string.
+    Execute an op command using the subprocess.run method and return the output as bytes.
+
+    The arguments are passed as a list directly to op (no shell), which
+    skips the /bin/sh fork per call and means dynamic fragments like
+    filenames and tag lists need no quoting or escaping.
+
+    op fails transiently sometimes, so failed calls are retried a couple
+    of times with exponential backoff — but errors op reports as
+    permanent (unknown item or vault, missing auth) raise on the first
+    attempt, and retrying stops once the total time budget is spent.
 
     Args:
-        cmd (str): The command to be executed.
+        args (list of str): The op arguments to be executed.
 
     Returns:
-        str: The output of the executed command.
+        bytes: The output of the executed command.
     """
-    # Fails for no reason sometimes, so try a few times
-    max_num_attempts = 1
-    num_attempts = 0
-    while num_attempts < max_num_attempts:
+    max_num_attempts = 3
+    deadline = time.monotonic() + _RETRY_BUDGET
+    for attempt in range(max_num_attempts):
         try:
-            return subprocess.run(f"{OP_CLI_PATH} {cmd}", shell=True, check=True, capture_output=True).stdout
-        except Exception as e:
-            num_attempts += 1
-            if num_attempts == max_num_attempts:
-                raise e
+            # close_fds=False lets CPython spawn op via posix_spawn
+            # instead of fork+exec, which is markedly cheaper on macOS
+            return subprocess.run([OP_CLI_PATH] + list(args), check=True, capture_output=True, env=op_env(), close_fds=False).stdout
+        except subprocess.CalledProcessError as e:
+            stderr = e.stderr or b""
+            if (attempt == max_num_attempts - 1
+                    or time.monotonic() >= deadline
+                    or any(msg in stderr for msg in _PERMANENT_ERRORS)):
+                raise
+            time.sleep(0.1 * 2 ** attempt)
 
-def J(cmd:str):
+def J(args:list):
     """
-    Execute a command and return the output as a JSON object.
+    Execute an op command and return the output as a JSON object.
 
     Args:
-        cmd (str): The command to be executed.
+        args (list of str): The op arguments to be executed.
 
     Returns:
         dict or list of dicts: A JSON object representing the output of the executed command.
     """
-    return json.loads(R(cmd + " --format=json"))
+    out = R(list(args) + ["--format=json"])
+    # orjson parses op's dict-heavy payloads several times faster and
+    # takes the bytes directly; stdlib json is the fallback
+    return orjson.loads(out) if orjson is not None else json.loads(out)
+
+def J_stream(args:list):
+    """
+    Yield the elements of a list-returning op command as they are parsed.
+
+    With ijson installed the JSON is decoded incrementally while op is
+    still writing it, so a multi-MB vault listing never has to sit in
+    memory twice (raw bytes plus decoded list) and parsing overlaps the
+    subprocess I/O. Without ijson this falls back to J().
+
+    Args:
+        args (list of str): The op arguments to be executed.
+
+    Yields:
+        dict: The elements of the JSON array the command outputs.
+    """
+    if ijson is None:
+        yield from J(args)
+        return
+    proc = subprocess.Popen([OP_CLI_PATH] + list(args) + ["--format=json"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=op_env(), close_fds=False)
+    try:
+        yield from ijson.items(proc.stdout, "item")
+    finally:
+        stderr = proc.stderr.read()
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, [OP_CLI_PATH] + list(args), stderr=stderr)
 
-def S(cmd:str) -> str:
+# The listing fields the cleanup logic actually reads; everything else
+# in an item list entry can be dropped as it streams past.
+_LIST_FIELDS = ("id", "title", "tags", "category", "state", "vault", "updated_at")
+
+def slim_item(itm:dict) -> dict:
     """
-    Execute a command using the subprocess.run method and return the output as a string.
+    Reduce an item list entry to the fields the cleanup logic reads.
 
     Args:
-        cmd (str): The command to be executed.
+        itm (dict): A full item list entry.
+
+    Returns:
+        dict: The entry with only the needed fields retained.
+    """
+    return {k: itm[k] for k in _LIST_FIELDS if k in itm}
+
+def S(args:list) -> str:
+    """
+    Execute an op command using the subprocess.run method and return the output as a string.
+
+    Args:
+        args (list of str): The op arguments to be executed.
 
     Returns:
         str: The output of the executed command.
     """
-    return R(cmd).decode("utf-8").strip()
+    return R(args).decode("utf-8").strip()
+
+@dataclass(slots=True)
+class DocRef:
+    """
+    A document recorded for cleanup, optionally with the item that
+    referenced it. Dict-merging (doc_j | {"referenced by": itm}) copied
+    the full item-get dict per recorded event; this just holds the two
+    references.
+    """
+    doc: dict
+    referenced_by: dict | None = None
+
+@dataclass(slots=True)
+class ReattachJob:
+    """
+    One resolved document-to-item reattachment queued for Step 2. Held
+    as slotted attributes instead of a twelve-key dict per row, which
+    the workers then unpack by attribute.
+    """
+    item_name: str
+    doc_name: str
+    item_link: str
+    ref_vid: str
+    ref_name_escaped: str
+    ref_sec: str
+    ref_field_id: str
+    ref_file_name: str
+    item_id: str
+    item_vid: str
+    item_tags: list
+    doc_tags: list
+
+_ITEM_GET_CACHE = {}
+_ITEM_GET_CACHE_LOCK = threading.Lock()
+
+# Optional on-disk layer under the in-memory cache, so a dry run
+# followed by a real run doesn't redo every item get. Entries carry the
+# updated_at stamp the item listing reported when they were stored and
+# are ignored once the listing reports a newer one.
+_ITEM_SHELF = None
+_ITEM_UPDATED_AT = {}
+
+def enable_disk_item_cache(path=".op_item_cache"):
+    """
+    Persist fetched item JSON to a shelve file across runs.
+
+    Args:
+        path (str): The shelve file to store items in.
+    """
+    global _ITEM_SHELF
+    try:
+        _ITEM_SHELF = shelve.open(path)
+        atexit.register(_ITEM_SHELF.close)
+    except OSError:
+        _ITEM_SHELF = None
+
+def note_updated_at(itms):
+    """
+    Record the updated_at stamps from an item listing; the disk cache
+    uses them to decide whether a stored item get is still current.
+
+    Args:
+        itms (iterable of dict): Item list entries.
+    """
+    for itm in itms:
+        if "updated_at" in itm:
+            _ITEM_UPDATED_AT[itm["id"]] = itm["updated_at"]
+
+def strip_item_for_disk(itm_j:dict) -> dict:
+    """
+    Drop secret field values from an item before it goes to the disk cache.
+
+    The shelve file is plaintext, and the script only ever reads an
+    item's title, vault, tags, files, category and REFERENCE-type
+    fields, so concealed values (passwords, one-time secrets, notes)
+    are withheld rather than persisted.
+
+    Args:
+        itm_j (dict): An item's full JSON.
+
+    Returns:
+        dict: A copy with only REFERENCE-type fields retained.
+    """
+    stripped = dict(itm_j)
+    stripped["fields"] = [f for f in itm_j.get("fields", []) if f.get("type", "") == "REFERENCE"]
+    return stripped
+
+def get_item(itm_id:str):
+    """
+    Fetch an item's full JSON, memoized by id for the duration of the run.
+
+    The same item can be fetched several times in one run (e.g. a
+    candidate item whose title matches multiple documents, or a document
+    referenced from multiple items); the remote state doesn't change
+    between reads, so repeat fetches just re-pay the op round-trip.
+    Call invalidate_item() after editing or deleting an item.
+
+    Args:
+        itm_id (str): The id of the item to fetch.
+
+    Returns:
+        dict: A JSON object representing the item.
+    """
+    stamp = _ITEM_UPDATED_AT.get(itm_id)
+    with _ITEM_GET_CACHE_LOCK:
+        if itm_id in _ITEM_GET_CACHE:
+            return _ITEM_GET_CACHE[itm_id]
+        if _ITEM_SHELF is not None and stamp is not None:
+            entry = _ITEM_SHELF.get(itm_id)
+            # a None item is a negative entry from the reference
+            # pre-check; it carries no item data, so fetch anyway
+            if entry is not None and entry.get("updated_at") == stamp and entry.get("item") is not None:
+                _ITEM_GET_CACHE[itm_id] = entry["item"]
+                return entry["item"]
+    itm_j = J(["item", "get", itm_id])
+    with _ITEM_GET_CACHE_LOCK:
+        _ITEM_GET_CACHE[itm_id] = itm_j
+        if _ITEM_SHELF is not None and stamp is not None:
+            _ITEM_SHELF[itm_id] = {"updated_at": stamp, "item": strip_item_for_disk(itm_j)}
+    return itm_j
+
+# op pretty-prints its JSON, so match the field-type marker with and
+# without the space
+_REFERENCE_NEEDLES = (b'"type": "REFERENCE"', b'"type":"REFERENCE"')
+
+def get_item_if_references(itm_id:str):
+    """
+    Fetch an item's full JSON only if it contains reference fields.
+
+    A bytes scan over op's raw output costs an order of magnitude less
+    than parsing it, and most items reference nothing, so the Step-1
+    prefetch skips decoding items whose JSON never mentions a REFERENCE
+    field. A miss is still remembered in the disk cache as a stamped
+    negative entry, so a later run doesn't re-fetch the (vast) majority
+    of items just to re-learn that they reference nothing.
+
+    Args:
+        itm_id (str): The id of the item to fetch.
+
+    Returns:
+        dict or None: The item's JSON, or None if it has no reference fields.
+    """
+    stamp = _ITEM_UPDATED_AT.get(itm_id)
+    with _ITEM_GET_CACHE_LOCK:
+        if itm_id in _ITEM_GET_CACHE:
+            return _ITEM_GET_CACHE[itm_id]
+        if _ITEM_SHELF is not None and stamp is not None:
+            entry = _ITEM_SHELF.get(itm_id)
+            if entry is not None and entry.get("updated_at") == stamp:
+                if entry["item"] is None:
+                    # negative entry: the item had no reference fields
+                    # when stored and the listing stamp hasn't changed
+                    return None
+                _ITEM_GET_CACHE[itm_id] = entry["item"]
+                return entry["item"]
+    raw = R(["item", "get", itm_id, "--format=json"])
+    if not any(needle in raw for needle in _REFERENCE_NEEDLES):
+        if _ITEM_SHELF is not None and stamp is not None:
+            with _ITEM_GET_CACHE_LOCK:
+                _ITEM_SHELF[itm_id] = {"updated_at": stamp, "item": None}
+        return None
+    itm_j = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    with _ITEM_GET_CACHE_LOCK:
+        _ITEM_GET_CACHE[itm_id] = itm_j
+        if _ITEM_SHELF is not None and stamp is not None:
+            _ITEM_SHELF[itm_id] = {"updated_at": stamp, "item": strip_item_for_disk(itm_j)}
+    return itm_j
+
+def invalidate_item(itm_id:str):
+    """
+    Drop an item from the get_item cache after it has been edited or deleted.
+
+    Args:
+        itm_id (str): The id of the item to forget.
+    """
+    with _ITEM_GET_CACHE_LOCK:
+        _ITEM_GET_CACHE.pop(itm_id, None)
+        if _ITEM_SHELF is not None:
+            _ITEM_SHELF.pop(itm_id, None)
+
+# Share links for the same item are requested repeatedly when several
+# items reference one document; each is its own op call, so remember them.
+_SHARE_LINK_CACHE = {}
+
+def get_share_link(itm_id:str, vault_id:str) -> str:
+    """
+    Fetch an item's share link, memoized by item and vault id.
+
+    Args:
+        itm_id (str): The id of the item.
+        vault_id (str): The id of the vault holding the item.
+
+    Returns:
+        str: The item's share link.
+    """
+    key = (itm_id, vault_id)
+    lnk = _SHARE_LINK_CACHE.get(key)
+    if lnk is None:
+        lnk = S(["item", "get", itm_id, "--share-link", "--vault", vault_id])
+        _SHARE_LINK_CACHE[key] = lnk
+    return lnk
+
+def bulk_item_get(ids, desc="", fetch=get_item) -> tuple:
+    """
+    Fetch the full JSON for many item ids at once.
+
+    Issuing one "op item get" subprocess per id serially pays a fresh
+    process spawn and network round-trip each time; fanning the calls out
+    through a thread pool overlaps those latencies. (An xargs -P style
+    single invocation was considered, but parallel op processes sharing
+    one stdout interleave their JSON output.)
+
+    Args:
+        ids (iterable of str): The item ids to fetch.
+        desc (str): Description for the progress bar, if any.
+        fetch (callable): The per-id fetcher; ids it returns None for are
+            left out of the result.
+
+    Returns:
+        tuple of dict, dict: Items by id, and fetch errors by id.
+    """
+    fetched = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        futures = {ex.submit(fetch, i): i for i in ids}
+        completed = as_completed(futures)
+        if desc != "":
+            completed = tqdm(completed, total=len(futures), desc=desc)
+        for future in completed:
+            i = futures[future]
+            try:
+                itm_j = future.result()
+                if itm_j is not None:
+                    fetched[i] = itm_j
+            except subprocess.CalledProcessError as e:
+                errors[i] = e
+    return fetched, errors
+
+# Each distinct pattern list compiles to a single lowercased alternation
+# once per run, so the substring checks below cost one regex scan of the
+# title instead of one Python-level scan per pattern.
+_WB_RE_CACHE = {}
+
+def _list_re(patterns):
+    """
+    Return a compiled case-insensitive alternation for a pattern list, cached per list.
+
+    Args:
+        patterns (sequence of str): The substrings to match.
+
+    Returns:
+        re.Pattern: A regex matching any of the (lowercased) substrings.
+    """
+    key = tuple(patterns)
+    rx = _WB_RE_CACHE.get(key)
+    if rx is None:
+        rx = re.compile("|".join(re.escape(p.lower()) for p in key))
+        _WB_RE_CACHE[key] = rx
+    return rx
 
 def allowed_by_white_black_lists(s, whitelist=[], blacklist=[], exact_match=False) -> tuple:
     """
@@ -128,11 +513,13 @@ def allowed_by_white_black_lists(s, whitelist=[], blacklist=[], exact_match=Fals
         tuple of bool, bool: A tuple of booleans indicating whether the string is allowed by the whitelist and blacklist, respectively.
     """
     if exact_match:
-        white_list_allowed = (len(whitelist) == 0 or any([w == s for w in whitelist]))
-        black_list_allowed = (len(blacklist) == 0 or all([b != s for b in blacklist]))
+        # set (or frozenset) arguments make these membership tests O(1)
+        white_list_allowed = (len(whitelist) == 0 or s in whitelist)
+        black_list_allowed = (len(blacklist) == 0 or s not in blacklist)
     else:
-        white_list_allowed = (len(whitelist) == 0 or any([w.lower() in s.lower() for w in whitelist]))
-        black_list_allowed = (len(blacklist) == 0 or all([b.lower() not in s.lower() for b in blacklist]))
+        sl = s.lower()
+        white_list_allowed = (len(whitelist) == 0 or _list_re(whitelist).search(sl) is not None)
+        black_list_allowed = (len(blacklist) == 0 or _list_re(blacklist).search(sl) is None)
     return (white_list_allowed, black_list_allowed)
 
 
@@ -141,12 +528,12 @@ def cleanup_documents(dry_run=DRY_RUN,
                        supervise_run=SUPERVISE_RUN,
                        confirm_before_modifying=False,
                        verbose=VERBOSE,
-                       item_whitelist=[],
-                       item_blacklist=[],
-                       doc_whitelist=[],
-                       doc_blacklist=[],
-                       tag_whitelist=[],
-                       tag_blacklist=[],
+                       item_whitelist=(),
+                       item_blacklist=(),
+                       doc_whitelist=(),
+                       doc_blacklist=(),
+                       tag_whitelist=(),
+                       tag_blacklist=(),
                        op_cli_path="",
                        generate_share_links=False,
                        reattached_tag=""):
@@ -156,15 +543,25 @@ def cleanup_documents(dry_run=DRY_RUN,
     verbose |= supervise_run # if we're supervising, we're verbose
     generate_share_links |= supervise_run # if we're supervising, we're generating share links
     confirm_before_modifying |= supervise_run # if we're supervising, we're confirming before modifying
-    archive_str = "--archive" if archive_docs else ""
-    dry_run_str = "--dry-run" if dry_run else ""
+    archive_args = ["--archive"] if archive_docs else []
+    dry_run_args = ["--dry-run"] if dry_run else []
     reattached_tag = reattached_tag.replace('"', '').replace("'", "").strip()
-    
-    # get all items from 1password
-    all_docs = [i for i in J(f"item list") if i["category"] == "DOCUMENT"]
-    tag_str = (" --tags " + ','.join([f'"{t}"' for t in tag_whitelist])) if len(tag_whitelist) > 0 else ""
-    all_itms_w_archive = [i for i in J(f"item list --include-archive" + tag_str) if i["category"] != "DOCUMENT"]
-    
+
+    # get all items from 1password, filtering and slimming the entries
+    # as they stream in
+    all_docs = [slim_item(i) for i in J_stream(["item", "list"]) if i["category"] == "DOCUMENT"]
+    tag_args = ["--tags", ','.join(tag_whitelist)] if len(tag_whitelist) > 0 else []
+    all_itms_w_archive = [slim_item(i) for i in J_stream(["item", "list", "--include-archive"] + tag_args) if i["category"] != "DOCUMENT"]
+    note_updated_at(all_docs)
+    note_updated_at(all_itms_w_archive)
+
+    # Index items by stripped title once, so each document looks up its
+    # name-matched candidates in O(1) instead of rescanning the full
+    # item list.
+    itms_by_title = defaultdict(list)
+    for itm in all_itms_w_archive:
+        itms_by_title[itm["title"].strip()].append(itm)
+
     
     # Keep track of reattached, skipped, and failed documents
     # for reporting at the end.
@@ -175,8 +572,14 @@ def cleanup_documents(dry_run=DRY_RUN,
     failed_docs = defaultdict(list)
     
     skipped_itms = set()
-    item_whitelist += doc_whitelist
-    item_blacklist += doc_blacklist
+    # merge into fresh tuples; += here would grow the caller's lists
+    # (and the shared defaults) across repeated invocations
+    item_whitelist = tuple(item_whitelist) + tuple(doc_whitelist)
+    item_blacklist = tuple(item_blacklist) + tuple(doc_blacklist)
+    # Build sets for the exact-match tag checks; the substring lists
+    # compile to cached regexes inside allowed_by_white_black_lists.
+    tag_whitelist_set = frozenset(tag_whitelist)
+    tag_blacklist_set = frozenset(tag_blacklist)
     for doc in all_docs:
         if (wbla := allowed_by_white_black_lists(doc["title"], item_whitelist, item_blacklist)) and False in wbla:
             rs = "item blacklisted" if not wbla[1] else "item not on whitelist"
@@ -184,7 +587,7 @@ def cleanup_documents(dry_run=DRY_RUN,
             skipped_itms.add(doc["id"])
         if doc["id"] not in skipped_itms:
             for tag in doc.get("tags", []):
-                if (wbla := allowed_by_white_black_lists(tag, tag_whitelist, tag_blacklist, exact_match=True)) and False in wbla:
+                if (wbla := allowed_by_white_black_lists(tag, tag_whitelist_set, tag_blacklist_set, exact_match=True)) and False in wbla:
                     rs = "item tag blacklisted" if not wbla[1] else "item tag not on whitelist"
                     skipped_docs[rs].append({"title": doc["title"]})
                     skipped_itms.add(doc["id"])
@@ -192,16 +595,44 @@ def cleanup_documents(dry_run=DRY_RUN,
     
     all_docs = [i for i in all_docs if i["id"] not in skipped_itms]
     removed_doc_ids = set()
-    
+
+    # Prefetch the full JSON for every document, and for every candidate
+    # item that could match a document by name, in parallel.
+    candidate_ids = set()
+    for doc in all_docs:
+        doc_name_split = doc["title"].rsplit(" - ", 1)
+        if len(doc_name_split) < 2:
+            continue
+        itm_check_name = doc_name_split[-1].strip()
+        candidate_ids.update(i["id"] for i in itms_by_title.get(itm_check_name, []))
+
+    # Newer op releases can include file summaries directly in the
+    # listing, in which case the per-document "item get" below is only
+    # needed for documents the listing didn't cover. Older releases
+    # reject the flag, so fall back to fetching everything.
+    files_by_id = {}
+    try:
+        files_by_id = {i["id"]: i for i in J(["item", "list", "--include-files"]) if "files" in i}
+    except subprocess.CalledProcessError:
+        pass
+    docs_by_id = {d["id"]: files_by_id[d["id"]] for d in all_docs if d["id"] in files_by_id}
+    docs_to_fetch = [d["id"] for d in all_docs if d["id"] not in docs_by_id]
+    fetched_docs, doc_get_errors = bulk_item_get(docs_to_fetch, f"(Step 1 of 3; no changes being made) Fetching {len(docs_to_fetch)} documents")
+    docs_by_id.update(fetched_docs)
+    itms_by_id, itm_get_errors = bulk_item_get(candidate_ids, f"(Step 1 of 3; no changes being made) Fetching {len(candidate_ids)} candidate items")
+
+    # Per-candidate file size/name sets, filled lazily in the loop below.
+    itm_file_sizes = {}
+    itm_file_names = {}
+
     # main loop over the documents.
     # perform a set of checks on each to determine if it should be
     # removed, reattached, or skipped.
     for doc in tqdm(all_docs, desc=f"(Step 1 of 3; no changes being made) Checking {len(all_docs)} documents for potential cleanup"):
-        try:
-            doc_i = doc["id"]
-            doc_j = J("item get " + doc_i)
-        except subprocess.CalledProcessError as e:
-            doc = next(i for i in all_docs if i["id"] == doc_i)
+        doc_i = doc["id"]
+        doc_j = docs_by_id.get(doc_i)
+        if doc_j is None:
+            e = doc_get_errors[doc_i]
             if verbose: print(f"-- Skipping: {doc['title']}, failed to get item: {e}")
             failed_docs[f"failed to get doc"].append({"item": doc["title"], "document": doc["title"], "error": e})
             continue
@@ -212,7 +643,7 @@ def cleanup_documents(dry_run=DRY_RUN,
         # if no files, remove the document
         if len(doc_files) == 0:
             if verbose: print(f"-- Removing: {doc_name}, no files")
-            removed_docs["no files"].append(doc_j)
+            removed_docs["no files"].append(DocRef(doc_j))
             removed_doc_ids.add(doc_i)
             continue
         
@@ -224,23 +655,23 @@ def cleanup_documents(dry_run=DRY_RUN,
         # if it has a name that looks like it was created during the upgrade
         # process (i.e. it has a name like "Document - Item Name"). 
         # Then, we can quickly find candidate items by name.
-        doc_name_split = doc_name.split(" - ")
+        doc_name_split = doc_name.rsplit(" - ", 1)
         # if the string after the " - " ends in a file extension, that doesn't
         # match. If the string after the " - " doens't end in a file extension,
         # then it's a match.
-        if len(doc_name_split) < 2 or ("." in doc_name_split[-1] and len(doc_name_split[-1].split(".")[-1]) > 0 and len(doc_name_split[-1].split(".")[-1]) < 5):
+        if len(doc_name_split) < 2 or _FILE_EXT_RE.search(doc_name_split[-1]):
             if verbose: print(f"-- Skipping: {doc_name}, not named like document from 1P v7 upgrade")
             skipped_docs["not named like document from 1P v7 upgrade"].append(doc_j)
             continue
         
         itm_check_name = doc_name_split[-1].strip()
-        matching_itms = [i for i in all_itms_w_archive if i["title"].strip() == itm_check_name]
+        matching_itms = itms_by_title.get(itm_check_name, [])
         # first check for explicit references to the document in archived items
         for candidate_itm in matching_itms:
             if candidate_itm.get("state", "") != "ARCHIVED": continue
-            try:
-                itm_j = J("item get " + candidate_itm["id"])
-            except subprocess.CalledProcessError as e:
+            itm_j = itms_by_id.get(candidate_itm["id"])
+            if itm_j is None:
+                e = itm_get_errors.get(candidate_itm["id"])
                 if verbose: print(f"-- Skipping: {candidate_itm['title']}, failed to get item: {e}")
                 failed_docs[f"failed to get item"].append({"item": candidate_itm["title"], "document": doc_name, "error": e})
                 continue
@@ -249,7 +680,7 @@ def cleanup_documents(dry_run=DRY_RUN,
             if len(refs) == 0: continue
             # remove doc
             if verbose: print(f"-- Removing: {doc_name}, referenced by archived item: {candidate_itm['title']}")
-            removed_docs["referenced by archived item"].append(doc_j | {"referenced by": candidate_itm})
+            removed_docs["referenced by archived item"].append(DocRef(doc_j, candidate_itm))
             removed_doc_ids.add(doc_i)
             break
         
@@ -260,30 +691,36 @@ def cleanup_documents(dry_run=DRY_RUN,
         # If not, reattach, otherwise remove.
         for candidate_itm in matching_itms:
             if candidate_itm.get("state", "") == "ARCHIVED": continue
-            try:
-                itm_j = J("item get " + candidate_itm["id"])
-            except subprocess.CalledProcessError as e:
+            itm_j = itms_by_id.get(candidate_itm["id"])
+            if itm_j is None:
+                e = itm_get_errors.get(candidate_itm["id"])
                 if verbose: print(f"-- Skipping: {candidate_itm['title']}, failed to get item: {e}")
                 failed_docs[f"failed to get item"].append({"item": candidate_itm["title"], "document": doc_name, "error": e})
                 continue
             itm_files = itm_j.get("files", [])
             if len(itm_files) == 0:
                 continue
-            if doc_size in [f["size"] for f in itm_files]:
+            # derive the size/name sets once per candidate item; several
+            # docs can share a candidate, and set membership is O(1)
+            cand_i = candidate_itm["id"]
+            if cand_i not in itm_file_sizes:
+                itm_file_sizes[cand_i] = frozenset(f["size"] for f in itm_files)
+                itm_file_names[cand_i] = frozenset(f["name"] for f in itm_files)
+            if doc_size in itm_file_sizes[cand_i]:
                 # remove
                 if verbose: print(f"-- Removing: {doc_name}, already attached to item (size match): {candidate_itm['title']}")
-                removed_docs["already attached to item (size match)"].append(doc_j | {"referenced by": candidate_itm})
+                removed_docs["already attached to item (size match)"].append(DocRef(doc_j, candidate_itm))
                 removed_doc_ids.add(doc_i)
                 break
-            if doc_name.replace(f" - {candidate_itm['title']}", "") in [f["name"] for f in itm_files]:
+            if doc_name.replace(f" - {candidate_itm['title']}", "") in itm_file_names[cand_i]:
                 # remove
                 if verbose: print(f"-- Removing: {doc_name}, already attached to item (name match): {candidate_itm['title']}")
-                removed_docs["already attached to item (name match)"].append(doc_j | {"referenced by": candidate_itm})
+                removed_docs["already attached to item (name match)"].append(DocRef(doc_j, candidate_itm))
                 removed_doc_ids.add(doc_i)
                 break
             # reattach doc
             if verbose: print(f"-- Reattaching: {doc_name}, fuzzy referenced by item: {candidate_itm['title']}")
-            reattached_docs[doc_i].append(doc_j | {"referenced by": candidate_itm})
+            reattached_docs[doc_i].append(DocRef(doc_j, candidate_itm))
             # only do one fuzzy reattachment per document
             break
         
@@ -294,7 +731,7 @@ def cleanup_documents(dry_run=DRY_RUN,
         # list with an item to check with user.
         if verbose: print(f"-- Remove pending approval: {doc_name}, no matching items")
         if confirm_before_modifying:
-            removal_pending_docs["no matching items"].append(doc_j)
+            removal_pending_docs["no matching items"].append(DocRef(doc_j))
         else:
             # skip
             if verbose: print(f"-- Skipping: {doc_name}, no matching items")
@@ -313,7 +750,7 @@ def cleanup_documents(dry_run=DRY_RUN,
             print("Reattaching:")
             for doc_id, reattachments in reattached_docs.items():
                 for reattachment in reattachments:
-                    print(f"  '{reattachment['title']}' to '{reattachment['referenced by']['title']}'")
+                    print(f"  '{reattachment.doc['title']}' to '{reattachment.referenced_by['title']}'")
         print(f"Found {num_removed_non_pending_total} document{'' if num_removed_non_pending_total == 1 else 's'} to remove.")
         # list the items that will be removed
         if num_removed_non_pending_total > 0:
@@ -321,10 +758,10 @@ def cleanup_documents(dry_run=DRY_RUN,
             for reason, docs in removed_docs.items():
                 print(f"  because {reason}: {len(docs)}")
                 for doc in docs:
-                    if 'referenced by' not in doc:
-                        print(f"    '{doc['title']}'")
+                    if doc.referenced_by is None:
+                        print(f"    '{doc.doc['title']}'")
                     else:
-                        print(f"    '{doc['title']}' referenced by '{doc['referenced by']['title']}'")
+                        print(f"    '{doc.doc['title']}' referenced by '{doc.referenced_by['title']}'")
         if num_removed_non_pending_total > 0 or num_reattached_total > 0:
             print("Shall I continue and reattach and/or remove all documents found? (Y/n)")
             rsp = input()
@@ -338,96 +775,137 @@ def cleanup_documents(dry_run=DRY_RUN,
         for reason, docs in removal_pending_docs.items():
             print(f"  because {reason}: {len(docs)}")
             for doc in docs:
-                print(f"    {doc['title']}")
+                print(f"    {doc.doc['title']}")
         print("Shall I remove the pending documents also? (y/N)")
         rsp = input()
         if rsp.lower().strip() == "y":
             removed_docs |= removal_pending_docs
             num_removed_non_pending_total += num_removed_pending_total
     
-    # reattach docs
+    # reattach docs, in two parallel phases: download every document
+    # file into a shared temp dir first, then run the attach/tag/delete
+    # chains. The downloads are pure network transfers and independent
+    # of each other, so batching them ahead of the edits keeps the op
+    # connection saturated instead of alternating between transfer and
+    # bookkeeping per document. Only the shared report dict needs the
+    # lock; the chain for a single document stays serial.
+    report_lock = threading.Lock()
+    deleted_doc_ids = set()
+    # op item edits replace whole items, so two documents fuzzy-matched
+    # to the same candidate item must not be edited concurrently (their
+    # jobs also share that item's cached tags list)
+    itm_edit_locks = defaultdict(threading.Lock)
+    def delete_doc(doc_ref):
+        # Tag then delete/archive one document. Shared by the reattach
+        # chain and the removal pass, with the id set guaranteeing each
+        # document is tagged and deleted exactly once even when it shows
+        # up in both.
+        doc_id = doc_ref.doc["id"]
+        with report_lock:
+            if doc_id in deleted_doc_ids:
+                return
+            deleted_doc_ids.add(doc_id)
+        doc_vid = doc_ref.doc["vault"]["id"]
+        doc_name = doc_ref.doc["title"]
+        try:
+            # tag doc before deleting
+            if verbose: print(f"---- tagging document before deleting")
+            if reattached_tag + " deleted" not in doc_ref.doc.get("tags", []):
+                doc_tags = doc_ref.doc.get("tags", [])
+                doc_tags.append(reattached_tag + " deleted")
+                R(["item", "edit", doc_id, "--vault", doc_vid] + dry_run_args + ["--tags", ','.join(doc_tags)])
+                if not dry_run:
+                    invalidate_item(doc_id)
+        except (subprocess.CalledProcessError, KeyError) as e:
+            if verbose: print(f"---- Skipping: {doc_name}, failed to tag document: {e}")
+            with report_lock:
+                failed_docs[f"failed to tag document before removal"].append({"item": doc_name, "document": doc_name, "error": e})
+        try:
+            if verbose: print(f"-- Removing '{doc_name}'")
+            if not dry_run:
+                R(["item", "delete", doc_id, "--vault", doc_vid] + archive_args)
+                invalidate_item(doc_id)
+        except (subprocess.CalledProcessError, KeyError) as e:
+            if verbose: print(f"---- Skipping: {doc_name}, failed to delete document: {e}")
+            with report_lock:
+                failed_docs[f"failed to delete document"].append({"item": doc_name, "document": doc_name, "error": e})
+
+    def download_one(idx, doc_id, doc_ref, tmp_dir):
+        itm_vid = doc_ref.referenced_by["vault"]["id"]
+        itm_name = doc_ref.referenced_by["title"]
+        doc_name = sanitize(doc_ref.doc["title"].replace(f" - {itm_name}", ""))
+        # the index prefix keeps same-named documents from colliding in
+        # the shared temp dir
+        out_file = os.path.join(tmp_dir, f"{idx}_{doc_name.replace(' ', '_')}")
+        if verbose: print(f"---- copying file to temp dir: {out_file}")
+        R(["document", "get", doc_id, "--vault", itm_vid, "--out-file", out_file])
+        return out_file
+
+    def reattach_one(doc_id, doc_ref, out_file):
+        itm_i = doc_ref.referenced_by["id"]
+        itm_vid = doc_ref.referenced_by["vault"]["id"]
+        itm_name = doc_ref.referenced_by["title"]
+        doc_name = doc_ref.doc["title"]
+        doc_name = sanitize(doc_name.replace(f" - {itm_name}", ""))
+        # dots separate section and field in op's assignment syntax, so
+        # they still need escaping in the field name; shell quoting is
+        # gone along with the shell
+        doc_name_escaped = doc_name.replace(".", "\\.")
+        if verbose: print(f"-- Reattaching '{doc_name}' to '{itm_name}'")
+        try:
+            with itm_edit_locks[itm_i]:
+                # fold the reattached tag update into the same item edit
+                # as the file attachment, rather than paying a second op
+                # call per document
+                tag_args = []
+                itm_tags = doc_ref.referenced_by.get("tags", [])
+                if reattached_tag != "" and reattached_tag + " fuzzy" not in itm_tags:
+                    itm_tags.append(reattached_tag + " fuzzy")
+                    tag_args = ["--tags", ','.join(itm_tags)]
+                if verbose: print(f"---- attaching file to item")
+                R(["item", "edit", itm_i, "--vault", itm_vid] + dry_run_args + tag_args + [f"{doc_name_escaped}[file]={out_file}"])
+                if not dry_run:
+                    invalidate_item(itm_i)
+        except (subprocess.CalledProcessError, KeyError) as e:
+            if verbose: print(f"---- Skipping: {doc_name} to {itm_name}, failed to reattach document: {e}")
+            with report_lock:
+                failed_docs[f"failed to reattach document"].append({"item": itm_name, "document": doc_name, "error": e})
+        delete_doc(doc_ref)
+
     if dry_run: print("DRY RUN: No changes will be made.")
-    for doc_id, itm_dicts in tqdm(reattached_docs.items(), desc=f"(Step 2 of 3) Reattaching {num_reattached_total} documents"):
-        for itm_dict in itm_dicts:
-            itm_i = itm_dict["referenced by"]["id"]
-            itm_vid = itm_dict["referenced by"]["vault"]["id"]
-            itm_name = itm_dict["referenced by"]["title"]
-            doc_name = itm_dict["title"]
-            doc_name = sanitize(doc_name.replace(f" - {itm_name}", ""))
-            doc_name_escaped = doc_name.replace(".", "\\.").replace('"', '').replace("'", "")
-            if verbose: print(f"-- Reattaching '{doc_name}' to '{itm_name}'")
-            with tempfile.TemporaryDirectory() as tmp_dir:
+    reattach_jobs = [(doc_id, doc_ref) for doc_id, doc_refs in reattached_docs.items() for doc_ref in doc_refs]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        out_files = {}
+        with ThreadPoolExecutor(max_workers=max(1, MAX_WORKERS // 2)) as ex:
+            futures = {ex.submit(download_one, idx, doc_id, doc_ref, tmp_dir): idx for idx, (doc_id, doc_ref) in enumerate(reattach_jobs)}
+            for future in tqdm(as_completed(futures), total=len(futures), desc=f"(Step 2 of 3) Downloading {num_reattached_total} documents"):
+                idx = futures[future]
                 try:
-                    out_file = os.path.join(tmp_dir, doc_name.replace(" ", "_").replace('"', '').replace("'", ""))
-                    if verbose: print(f"---- copying file to temp dir: {out_file}")
-                    R(f"document get {doc_id} --vault {itm_vid} --out-file '{out_file}'")
-                    
-                    if verbose: print(f"---- attaching file to item")
-                    R(f"item edit {itm_i} --vault {itm_vid} {dry_run_str} '{doc_name_escaped}[file]={out_file}'")
+                    out_files[idx] = future.result()
                 except (subprocess.CalledProcessError, KeyError) as e:
+                    doc_id, doc_ref = reattach_jobs[idx]
+                    itm_name = doc_ref.referenced_by["title"]
+                    doc_name = sanitize(doc_ref.doc["title"].replace(f" - {itm_name}", ""))
                     if verbose: print(f"---- Skipping: {doc_name} to {itm_name}, failed to reattach document: {e}")
                     failed_docs[f"failed to reattach document"].append({"item": itm_name, "document": doc_name, "error": e})
-                try:
-                    if reattached_tag != "":
-                        if verbose: print(f"---- adding reattached tag to item")
-                        itm_tags = itm_dict["referenced by"].get("tags", [])
-                        if reattached_tag + " fuzzy" not in itm_tags:
-                            itm_tags.append(reattached_tag + " fuzzy")
-                            itm_tags = ','.join([f'"{t}"' for t in itm_tags])
-                            R(f"item edit {itm_i} --vault {itm_vid} {dry_run_str} --tags {itm_tags}")
-                except (subprocess.CalledProcessError, KeyError) as e:
-                    if verbose: print(f"---- Skipping: {doc_name} to {itm_name}, failed to add reattached tag to item: {e}")
-                    failed_docs[f"failed to add reattached tag to item"].append({"item": itm_name, "document": doc_name, "error": e})
-                try:
-                    # tag doc before deleting
-                    if verbose: print(f"---- tagging document before deleting")
-                    if reattached_tag + " deleted" not in itm_dict.get("tags", []):
-                        doc_tags = itm_dict.get("tags", [])
-                        doc_tags.append(reattached_tag + " deleted")
-                        doc_tags = ','.join([f'"{t}"' for t in doc_tags])
-                        doc_vid = itm_dict["vault"]["id"]
-                        R(f"item edit {doc_id} --vault {doc_vid} {dry_run_str} --tags {doc_tags}")
-                except (subprocess.CalledProcessError, KeyError) as e:
-                    if verbose: print(f"---- Skipping: {doc_name} to {itm_name}, failed to tag document: {e}")
-                    failed_docs[f"failed to tag document before removal"].append({"item": itm_name, "document": doc_name, "error": e})
-                try:
-                    if verbose: print(f"---- deleting document")
-                    if not dry_run:
-                        R(f"item delete {doc_id} --vault {doc_vid} {archive_str}")
-                except (subprocess.CalledProcessError, KeyError) as e:
-                    if verbose: print(f"---- Skipping: {doc_name} to {itm_name}, failed to delete document: {e}")
-                    failed_docs[f"failed to delete document"].append({"item": itm_name, "document": doc_name, "error": e})
+        with ThreadPoolExecutor(max_workers=max(1, MAX_WORKERS // 2)) as ex:
+            futures = [ex.submit(reattach_one, doc_id, doc_ref, out_files[idx]) for idx, (doc_id, doc_ref) in enumerate(reattach_jobs) if idx in out_files]
+            for future in tqdm(as_completed(futures), total=len(futures), desc=f"(Step 2 of 3) Reattaching {len(futures)} documents"):
+                future.result()
 
-    # remove docs
+    # remove docs, through the same delete pipeline the reattach chain
+    # used so nothing is tagged or deleted twice
     if dry_run: print("DRY RUN: No changes will be made.")
     removed_docs_list = [doc for docs in removed_docs.values() for doc in docs]
-    for itm_dict in tqdm(removed_docs_list, desc=f"(Step 3 of 3) Removing {num_removed_non_pending_total} documents"):
-        # tag doc before deleting
-        doc_id = itm_dict["id"]
-        doc_vid = itm_dict["vault"]["id"]
-        doc_name = itm_dict["title"]
-        if verbose: print(f"---- tagging document before deleting")
-        try:
-            if reattached_tag + " deleted" not in itm_dict.get("tags", []):
-                doc_tags = itm_dict.get("tags", [])
-                doc_tags.append(reattached_tag + " deleted")
-                doc_tags = ','.join([f'"{t}"' for t in doc_tags])
-                R(f"item edit {doc_id} --vault {doc_vid} {dry_run_str} --tags {doc_tags}")
-        except subprocess.CalledProcessError as e:
-            if verbose: print(f"---- Skipping: {doc_name}, failed to remove document: {e}")
-            failed_docs[f"failed to tag document before removal"].append({"item": doc_name, "document": doc_name, "error": e})
-        if verbose: print(f"-- Removing '{doc_name}'")
-        try:
-            if not dry_run:
-                R(f"item delete {doc_id} --vault {doc_vid} {archive_str}")
-        except subprocess.CalledProcessError as e:
-            if verbose: print(f"---- Skipping: {doc_name}, failed to remove document: {e}")
-            failed_docs[f"failed to delete document"].append({"item": doc_name, "document": doc_name, "error": e})
+    with ThreadPoolExecutor(max_workers=max(1, MAX_WORKERS // 2)) as ex:
+        futures = [ex.submit(delete_doc, doc_ref) for doc_ref in removed_docs_list]
+        for future in tqdm(as_completed(futures), total=len(futures), desc=f"(Step 3 of 3) Removing {num_removed_non_pending_total} documents"):
+            future.result()
 
     # print report, starting with summary, then if verbose list the details
     # of the reattached, removed, skipped, and failed documents.
     if dry_run: print("DRY RUN: No changes were made.")
-    reattached_item_names = list(set([doc["referenced by"]["title"] for docs in reattached_docs.values() for doc in docs]))
+    reattached_item_names = list(set([doc.referenced_by["title"] for docs in reattached_docs.values() for doc in docs]))
     num_skipped = sum([len(v) for v in skipped_docs.values()])
     num_failed = sum([len(v) for v in failed_docs.values()])
     print(f"Reattached {len(reattached_docs)} documents to {len(reattached_item_names)} items.")
@@ -435,7 +913,7 @@ def cleanup_documents(dry_run=DRY_RUN,
         print("Reattached documents:")
         for doc_id, reattachments in reattached_docs.items():
             for reattachment in reattachments:
-                print(f"  {reattachment['title']} to {reattachment['referenced by']['title']}")
+                print(f"  {reattachment.doc['title']} to {reattachment.referenced_by['title']}")
     print(f"Removed {len(removed_docs)} documents.")
     if verbose and num_skipped > 0:
         print(f"Skipped {num_skipped} documents because")
@@ -449,21 +927,25 @@ def cleanup_documents(dry_run=DRY_RUN,
     # Print a full report to a csv file, 1password_document_reattacher_report_{current_date_time}.csv in the current directory
     current_date_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     csv_file_name = f"1password_document_reattacher_report_{current_date_time}.csv"
-    with open(csv_file_name, "w") as f:
-        writer = csv.writer(f)
-        writer.writerow(["document", "action", "item", "reason"])
+    def report_rows():
         for doc_id, reattachments in reattached_docs.items():
             for reattachment in reattachments:
-                writer.writerow([reattachment["title"], "reattached", reattachment["referenced by"]["title"], "matched by item/doc name"])
+                yield [reattachment.doc["title"], "reattached", reattachment.referenced_by["title"], "matched by item/doc name"]
         for reason, docs in removed_docs.items():
             for doc in docs:
-                writer.writerow([doc["title"], "removed", doc["referenced by"]["title"] if "referenced by" in doc else "", reason])
+                yield [doc.doc["title"], "removed", doc.referenced_by["title"] if doc.referenced_by is not None else "", reason]
         for reason, docs in skipped_docs.items():
             for doc in docs:
-                writer.writerow([doc["title"], "skipped", "", reason])
+                yield [doc["title"], "skipped", "", reason]
         for reason, docs in failed_docs.items():
             for doc in docs:
-                writer.writerow([doc["item"], reason, doc["document"], doc["error"]])
+                yield [doc["item"], reason, doc["document"], doc["error"]]
+    # writerows over one generator keeps the row loop in C, and the
+    # large buffer avoids a write syscall per row
+    with open(csv_file_name, "w", newline="", buffering=1<<20) as f:
+        writer = csv.writer(f)
+        writer.writerow(["document", "action", "item", "reason"])
+        writer.writerows(report_rows())
     
     print(f"Done. Report written to {os.path.join(os.getcwd(), csv_file_name)}")
             
@@ -474,264 +956,409 @@ def main(dry_run=DRY_RUN,
         supervise_run=SUPERVISE_RUN,
         confirm_before_modifying=False,
         verbose=VERBOSE,
-        item_whitelist=[],
-        item_blacklist=[],
-        doc_whitelist=[],
-        doc_blacklist=[],
-        tag_whitelist=[],
-        tag_blacklist=[],
+        item_whitelist=(),
+        item_blacklist=(),
+        doc_whitelist=(),
+        doc_blacklist=(),
+        tag_whitelist=(),
+        tag_blacklist=(),
         op_cli_path="",
         generate_share_links=False,
-        reattached_tag=""):
+        reattached_tag="",
+        stats=False):
     verbose |= supervise_run # if we're supervising, we're verbose
     generate_share_links |= supervise_run # if we're supervising, we're generating share links
     confirm_before_modifying |= supervise_run # if we're supervising, we're confirming before reattaching
-    archive_str = "--archive" if archive_docs else ""
-    dry_run_str = "--dry-run" if dry_run else ""
+    archive_args = ["--archive"] if archive_docs else []
+    dry_run_args = ["--dry-run"] if dry_run else []
     reattached_tag = reattached_tag.replace('"', '').replace("'", "").strip()
-    
+
     # print opening and list user options
     if verbose:
         print("1Password document reattacher running with options:")
         print("\n".join([f"{dry_run=}", f"{archive_docs=}", f"{supervise_run=}", f"{verbose=}", f"{item_whitelist=}", f"{item_blacklist=}", f"{doc_whitelist=}", f"{doc_blacklist=}", f"{tag_whitelist=}", f"{tag_blacklist=}", f"{op_cli_path=}", f"{generate_share_links=}"]))
-    
-    # get all items from 1password
-    all_itms = J(f"item list")
 
-    if verbose:
+    # get all items from 1password, parsing the listing incrementally
+    # while op is still writing it (the list is walked several times
+    # below, so materialize it)
+    all_itms = list(J_stream(["item", "list"]))
+    note_updated_at(all_itms)
+
+    if stats:
         # Print some fun information about the items in the vault,
-        # just for fun.
-        itms_by_category = defaultdict(list)
-        itms_by_tag = defaultdict(list)
-        itms_by_vault = defaultdict(list)
+        # just for fun. Only the counts are ever shown, so tally with
+        # Counters rather than keeping lists of items alive per key.
+        counts_by_category = Counter()
+        counts_by_tag = Counter()
+        counts_by_vault = Counter()
         for itm in all_itms:
-            itms_by_category[itm["category"]].append(itm)
-            itms_by_vault[itm["vault"]["name"]].append(itm)
-            for tag in itm.get("tags", []):
-                itms_by_tag[tag].append(itm)
+            counts_by_category[itm["category"]] += 1
+            counts_by_vault[itm["vault"]["name"]] += 1
+            counts_by_tag.update(itm.get("tags", []))
 
         # Print total number of items
         print(f"Total number of items: {len(all_itms)}")
-        # Print number of items by vault, in descending order
-        # by number of items, and print the percentage of the total
-        # for each vault.
-        print("\nVaults:")
-        itms = itms_by_vault
-        sorted_names = sorted(itms.keys(), key=lambda k: len(itms[k]), reverse=True)
-        longest_name_len = max([len(n) for n in sorted_names])
-        for k in sorted_names:
-            v = itms[k]
-            print(f"  {k:{longest_name_len}}  {len(v)} ({len(v)/len(all_itms)*100:.1f}%)")
-
-        # Again for categories
-        print("\nCategories:")
-        itms = itms_by_category
-        sorted_names = sorted(itms.keys(), key=lambda k: len(itms[k]), reverse=True)
-        longest_name_len = max([len(n) for n in sorted_names])
-        for k in sorted_names:
-            v = itms[k]
-            print(f"  {k:{longest_name_len}}  {len(v)} ({len(v)/len(all_itms)*100:.1f}%)")
-            
-        # Again for tags
-        print("\nTags:")
-        itms = itms_by_tag
-        sorted_names = sorted(itms.keys(), key=lambda k: len(itms[k]), reverse=True)
-        longest_name_len = max([len(n) for n in sorted_names])
-        for k in sorted_names:
-            v = itms[k]
-            print(f"  {k:{longest_name_len}}  {len(v)} ({len(v)/len(all_itms)*100:.1f}%)")
+        # Print number of items by vault, category, and tag, in
+        # descending order by number of items, with the percentage of
+        # the total for each.
+        for label, counts in (("Vaults", counts_by_vault), ("Categories", counts_by_category), ("Tags", counts_by_tag)):
+            print(f"\n{label}:")
+            longest_name_len = max((len(n) for n in counts), default=0)
+            for k, v in counts.most_common():
+                print(f"  {k:{longest_name_len}}  {v} ({v/len(all_itms)*100:.1f}%)")
 
-    # Keep track of reattached, skipped, and failed documents
-    # for reporting at the end.
+    # Keep track of documents to reattach; skips and failures stream
+    # straight to the report file as each decision is made, so the run
+    # holds only per-reason counts in memory (plus the detail lists when
+    # verbose, since only verbose runs print them at the end).
     reattached_docs = defaultdict(list)
-    skipped_docs = defaultdict(list)
-    failed_docs = defaultdict(list)
+    skipped_counts = defaultdict(int)
+    failed_counts = defaultdict(int)
+    skipped_details = defaultdict(list) if verbose else None
+    failed_details = defaultdict(list) if verbose else None
+    report_lock = threading.Lock()
+    current_date_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    report_path = f"1password_document_reattacher_report_{current_date_time}.csv"
+    report_file = open(report_path, "w", newline="", buffering=1<<20)
+    report_writer = csv.writer(report_file)
+    report_writer.writerow(["item", "document", "item link", "status"])
+
+    def record_skip(reason, itm_name, doc_name="", itm_lnk=""):
+        with report_lock:
+            skipped_counts[reason] += 1
+            if skipped_details is not None:
+                skipped_details[reason].append(f"{itm_name}" + (f" - {doc_name}" if doc_name != "" else ""))
+            report_writer.writerow([itm_name, doc_name, itm_lnk, f"skipped: {reason}"])
+
+    def record_fail(reason, itm_name, doc_name="", itm_lnk="", error=None):
+        with report_lock:
+            failed_counts[reason] += 1
+            if failed_details is not None:
+                failed_details[reason].append(f"{itm_name}" + (f" - {doc_name}" if doc_name != "" else ""))
+            report_writer.writerow([itm_name, doc_name, itm_lnk, f"error: {error}"])
 
     # precheck items skipped by blacklist or whitelist
     all_itms = [i for i in all_itms if i["category"] != "DOCUMENT"]
     skipped_itms = set()
+    # Build sets for the exact-match tag checks; the substring lists
+    # compile to cached regexes inside allowed_by_white_black_lists.
+    tag_whitelist_set = frozenset(tag_whitelist)
+    tag_blacklist_set = frozenset(tag_blacklist)
     for itm in all_itms:
         if (wbla := allowed_by_white_black_lists(itm["title"], item_whitelist, item_blacklist)) and False in wbla:
             rs = "item blacklisted" if not wbla[1] else "item not on whitelist"
-            skipped_docs[rs].append({"item": itm["title"], "document": "", "item link": ""})
+            record_skip(rs, itm["title"])
             skipped_itms.add(itm["id"])
         if itm["id"] not in skipped_itms:
             for tag in itm.get("tags", []):
-                if (wbla := allowed_by_white_black_lists(tag, tag_whitelist, tag_blacklist, exact_match=True)) and False in wbla:
+                if (wbla := allowed_by_white_black_lists(tag, tag_whitelist_set, tag_blacklist_set, exact_match=True)) and False in wbla:
                     rs = "item tag blacklisted" if not wbla[1] else "item tag not on whitelist"
-                    skipped_docs[rs].append({"item": itm["title"], "document": "", "item link": ""})
+                    record_skip(rs, itm["title"])
                     skipped_itms.add(itm["id"])
                     break
 
     # Get item ids for all items that are not skipped
     itm_ids = [i["id"] for i in all_itms if i["id"] not in skipped_itms]
 
+    # Warm the item cache in parallel before the sequential decision
+    # loop below. The loop's get_item calls then hit the cache, the op
+    # round-trips overlap instead of running one per item, and the
+    # supervision prompts stay on the main thread.
+    itms_by_id, itm_errs = bulk_item_get(itm_ids, f"(Step 1 of 2; no changes being made) Fetching {len(itm_ids)} items", fetch=get_item_if_references)
+
+    # One listing of every document answers "is this reference a
+    # document?" for all references at once, so only references that are
+    # actually documents pay an item get (the listing doesn't carry file
+    # details, which the reattachment needs). Fall back to per-reference
+    # fetches if the op version rejects the category filter.
+    docs_by_id = None
+    try:
+        docs_by_id = {d["id"]: slim_item(d) for d in J_stream(["item", "list", "--categories", "Document", "--include-archive"])}
+        note_updated_at(docs_by_id.values())
+    except subprocess.CalledProcessError:
+        pass
+    itm_title_by_id = {i["id"]: i["title"] for i in all_itms}
+
+    ref_ids = set()
+    for itm_j in itms_by_id.values():
+        ref_ids.update(r["value"] for r in itm_j.get("fields", []) if r.get("type", "") == "REFERENCE" and r.get("value", "") != "")
+    if docs_by_id is not None:
+        ref_ids &= set(docs_by_id)
+    refs_by_id, ref_errs = {}, {}
+    if len(ref_ids) > 0:
+        refs_by_id, ref_errs = bulk_item_get(ref_ids, f"(Step 1 of 2; no changes being made) Fetching {len(ref_ids)} referenced documents")
+
     if dry_run: print("DRY RUN: No changes will be made.")
 
+    # Step 2 runs as a pool of consumers fed from the Step-1 loop below,
+    # so downloads and edits overlap with the remaining resolution work
+    # instead of waiting for the whole reattached_docs dict to be built.
+    # When the user must confirm first, the consumers idle on start_evt
+    # (and the queue is unbounded so the producer never blocks on them);
+    # otherwise they start the moment the first reference resolves.
+    work_q = queue.Queue(maxsize=0 if confirm_before_modifying else 64)
+    start_evt = threading.Event()
+    cancel_evt = threading.Event()
+    if not confirm_before_modifying:
+        start_evt.set()
+    step2_bar = tqdm(desc="(Step 2 of 2) Reattaching documents", unit="doc")
+    # op item edits replace whole items, so two refs pointing at the same
+    # item must not be edited concurrently
+    itm_edit_locks = defaultdict(threading.Lock)
+    # one temp dir shared by all Step-2 jobs, rather than paying a
+    # directory create + cleanup walk per document; filenames are made
+    # unique below and unlinked as each job finishes
+    step2_tmp = tempfile.TemporaryDirectory()
+
+    def reattach_ref(ref_id, job):
+        ref_vid = job.ref_vid
+        ref_name_escaped = job.ref_name_escaped
+        ref_sec = job.ref_sec
+        ref_field_id = job.ref_field_id
+        itm_i = job.item_id
+        itm_vid = job.item_vid
+        itm_name = job.item_name
+        ref_name = job.doc_name
+        ref_file_name = job.ref_file_name
+        itm_lnk = job.item_link
+        itm_tags = job.item_tags
+        doc_tags = job.doc_tags
+        if verbose: print(f"-- Reattaching '{ref_name}' to '{itm_name}'")
+        # the item and field ids make the name unique across concurrent
+        # jobs sharing the one temp dir
+        out_file = os.path.join(step2_tmp.name, f"{itm_i}_{ref_field_id}_{ref_file_name.replace(' ', '_')}")
+        try:
+            if verbose: print(f"---- copying file to temp dir: {out_file}")
+            R(["document", "get", ref_id, "--vault", ref_vid, "--out-file", out_file])
+
+            with itm_edit_locks[itm_i]:
+                # one item edit attaches the file, removes the
+                # reference field, and (when needed) adds the
+                # reattached tag, instead of three op calls
+                tag_args = []
+                if reattached_tag != "" and reattached_tag not in itm_tags:
+                    itm_tags.append(reattached_tag)
+                    tag_args = ["--tags", ','.join(itm_tags)]
+                if verbose: print(f"---- attaching file to item and deleting document reference")
+                R(["item", "edit", itm_i, "--vault", itm_vid] + dry_run_args + tag_args + [f"{ref_name_escaped}[file]={out_file}", f"{ref_sec}.{ref_field_id}[delete]"])
+
+            if verbose: print(f"---- tagging document before deletion")
+            if reattached_tag + " deleted" not in doc_tags:
+                doc_tags.append(reattached_tag + " deleted")
+                R(["item", "edit", ref_id, "--vault", ref_vid] + dry_run_args + ["--tags", ','.join(doc_tags)])
+
+            if verbose: print(f"---- deleting document")
+            # dry-run edits change nothing server-side, so they must not
+            # evict the cache entries a later real run wants to reuse
+            if not dry_run:
+                R(["item", "delete", ref_id, "--vault", ref_vid] + archive_args)
+                invalidate_item(itm_i)
+                invalidate_item(ref_id)
+        except (subprocess.CalledProcessError, KeyError) as e:
+            if verbose: print(f"---- Skipping: {ref_name} to {itm_name}, failed to reattach document: {e}")
+            record_fail("failed to reattach document", itm_name, ref_name, itm_lnk, e)
+        finally:
+            try:
+                os.unlink(out_file)
+            except FileNotFoundError:
+                pass
+
+    def reattach_worker():
+        while True:
+            job = work_q.get()
+            if job is None:
+                return
+            start_evt.wait()
+            if cancel_evt.is_set():
+                continue
+            try:
+                reattach_ref(*job)
+            except Exception as e:
+                # a dead worker would silently strand its share of the
+                # queue (and, with the bounded queue, eventually deadlock
+                # the producer), so nothing may escape this loop
+                record_fail("failed to reattach document", job[1].item_name, job[1].doc_name, job[1].item_link, e)
+            step2_bar.update(1)
+
+    num_step2_workers = max(1, MAX_WORKERS // 2)
+    step2_pool = ThreadPoolExecutor(max_workers=num_step2_workers)
+    for _ in range(num_step2_workers):
+        step2_pool.submit(reattach_worker)
+
+    step2_drained = False
+
+    def drain_step2(cancel=False):
+        # idempotent so the try/finally around Step 1 can call it
+        # unconditionally without re-draining after a normal exit
+        nonlocal step2_drained
+        if step2_drained:
+            return
+        step2_drained = True
+        if cancel:
+            cancel_evt.set()
+        # workers gated on start_evt hold a job each; wake them so they
+        # can discard it (or run it) and reach their sentinel
+        start_evt.set()
+        for _ in range(num_step2_workers):
+            work_q.put(None)
+        step2_pool.shutdown(wait=True)
+        step2_bar.close()
+        step2_tmp.cleanup()
+
     # Loop over each item, check for references to documents,
     # reattach the documents, and delete the document references
     # and document items if successful.
-    count = 0
-    max_count = 0
-    for itm_i in tqdm(itm_ids, desc=f"(Step 1 of 2; no changes being made) Checking {len(itm_ids)} items for reattachable documents"):
-        count += 1
-        if count > max_count and max_count > 0:
-            break
-        try:
-            itm_j = J("item get " + itm_i)
-        except subprocess.CalledProcessError as e:
-            itm = next(i for i in all_itms if i["id"] == itm_i)
-            if verbose: print(f"-- Skipping: {itm['title']}, failed to get item: {e}")
-            failed_docs[f"failed to get item"].append({"item": itm['title'], "document": "", "item link": "", "error": e})
-            continue
-        itm_name = itm_j["title"]
-        itm_vid = itm_j["vault"]["id"]
-        # Get item fields that are references to other items
-        refs = [r for r in itm_j.get("fields",[]) if r.get("type", "") == "REFERENCE"]
-        try:
-            itm_lnk = S(f"item get {itm_i} --share-link --vault {itm_vid}") if generate_share_links else ""
-        except subprocess.CalledProcessError as e:
-            if verbose: print(f"-- Skipping: {itm['title']}, , failed to get item link: {e}")
-            failed_docs[f"failed to get item link"].append({"item": itm_name, "document": "", "item link": "", "error": e})
-            continue
-        if verbose and len(refs) > 0:
-            print(f"Processing: {itm_name} ({dry_run=})")
-            print(f"-- {itm_lnk}")
-            print(f"-- Found {len(refs)} references")
-        # Loop over each reference to a document
-        for ref in refs:
+    # an uncaught exception (or Ctrl-C) here must still wake and
+    # drain the Step-2 workers, or the non-daemon pool threads block
+    # on work_q.get() forever and the interpreter never exits
+    try:
+        count = 0
+        max_count = 0
+        for itm_i in tqdm(itm_ids, desc=f"(Step 1 of 2; no changes being made) Checking {len(itm_ids)} items for reattachable documents"):
+            count += 1
+            if count > max_count and max_count > 0:
+                break
+            # the prefetch already recorded per-id failures, so branch on its
+            # result dicts instead of re-raising (and re-fetching) through
+            # get_item for every miss
+            itm_j = itms_by_id.get(itm_i)
+            if itm_j is None:
+                if itm_i in itm_errs:
+                    e = itm_errs[itm_i]
+                    itm_name = itm_title_by_id.get(itm_i, itm_i)
+                    if verbose: print(f"-- Skipping: {itm_name}, failed to get item: {e}")
+                    record_fail("failed to get item", itm_name, error=e)
+                # otherwise the raw-bytes pre-check saw no reference fields,
+                # so there is nothing to do for this item
+                continue
+            itm_name = itm_j["title"]
+            itm_vid = itm_j["vault"]["id"]
+            # Get item fields that are references to other items
+            refs = [r for r in itm_j.get("fields",[]) if r.get("type", "") == "REFERENCE"]
             try:
-                ref_id = ref["value"]
-                # print(ref)
-                ref_j = J(f"item get {ref_id}")
-                ref_vid = ref_j["vault"]["id"]
-                ref_name = ref_j["title"]
-                # Check if the document is allowed by the whitelist and blacklist
-                if (wbla := allowed_by_white_black_lists(ref_name, doc_whitelist, doc_blacklist)) and False in wbla:
-                    rs = "doc blacklisted" if not wbla[1] else "doc not on whitelist"
-                    if verbose: print(f"-- Skipping: {ref_name}, {rs}")
-                    skipped_docs[rs].append({"item": itm_name, "document": ref_name, "item link": itm_lnk})
-                    continue
-                if ref_j["category"] != "DOCUMENT":
-                    if verbose: print(f"-- Skipping: {ref_name}, not a document")
-                    skipped_docs["not a document"].append({"item": itm_name, "document": ref_name, "item link": itm_lnk})
-                    continue
+                # most items have no references, so don't pay a share-link op
+                # call for items the run will never mention
+                itm_lnk = get_share_link(itm_i, itm_vid) if generate_share_links and len(refs) > 0 else ""
+            except subprocess.CalledProcessError as e:
+                if verbose: print(f"-- Skipping: {itm_name}, , failed to get item link: {e}")
+                record_fail("failed to get item link", itm_name, error=e)
+                continue
+            if verbose and len(refs) > 0:
+                print(f"Processing: {itm_name} ({dry_run=})")
+                print(f"-- {itm_lnk}")
+                print(f"-- Found {len(refs)} references")
+            # Loop over each reference to a document
+            for ref in refs:
+                try:
+                    ref_id = ref["value"]
+                    # print(ref)
+                    if docs_by_id is not None and ref_id not in docs_by_id:
+                        ref_name = itm_title_by_id.get(ref_id, ref_id)
+                        if verbose: print(f"-- Skipping: {ref_name}, not a document")
+                        record_skip("not a document", itm_name, ref_name, itm_lnk)
+                        continue
+                    if ref_id in ref_errs:
+                        e = ref_errs[ref_id]
+                        ref_name = itm_title_by_id.get(ref_id, ref_id)
+                        if verbose: print(f"---- Skipping: {ref_name}, failed to check document: {e}")
+                        record_fail("failed to check document", itm_name, ref_name, itm_lnk, e)
+                        continue
+                    ref_j = refs_by_id.get(ref_id)
+                    if ref_j is None:
+                        ref_j = get_item(ref_id)
+                    ref_vid = ref_j["vault"]["id"]
+                    ref_name = ref_j["title"]
+                    # Check if the document is allowed by the whitelist and blacklist
+                    if (wbla := allowed_by_white_black_lists(ref_name, doc_whitelist, doc_blacklist)) and False in wbla:
+                        rs = "doc blacklisted" if not wbla[1] else "doc not on whitelist"
+                        if verbose: print(f"-- Skipping: {ref_name}, {rs}")
+                        record_skip(rs, itm_name, ref_name, itm_lnk)
+                        continue
+                    if ref_j["category"] != "DOCUMENT":
+                        if verbose: print(f"-- Skipping: {ref_name}, not a document")
+                        record_skip("not a document", itm_name, ref_name, itm_lnk)
+                        continue
                 
-                # prepare for copying document file to temp dir, and get
-                # permission to continue if supervising
-                ref_name = sanitize(ref_name.replace(f" - {itm_name}", ""))
-                ref_sec = ref["section"]["label"]
-                ref_field_id = ref["id"]
-                if verbose:
-                    ref_lnk = S(f"item get {ref_id} --share-link --vault {ref_vid}") if generate_share_links else ""
-                    print(f"-- Processing: {ref_name}")
-                    print(f"---- {ref_lnk}")
-                    if supervise_run:
-                        print(f"---- Shall I continue and reattach this document? (Y/n)")
-                        rsp = input()
-                        if rsp.lower().strip() == "n":
-                            print(f"---- User skipping: {ref_name}")
-                            skipped_docs["user skipped"].append({"item": itm_name, "document": ref_name, "item link": itm_lnk})
-                            continue
+                    # prepare for copying document file to temp dir, and get
+                    # permission to continue if supervising
+                    ref_name = sanitize(ref_name.replace(f" - {itm_name}", ""))
+                    ref_sec = ref["section"]["label"]
+                    ref_field_id = ref["id"]
+                    if verbose:
+                        ref_lnk = get_share_link(ref_id, ref_vid) if generate_share_links else ""
+                        print(f"-- Processing: {ref_name}")
+                        print(f"---- {ref_lnk}")
+                        if supervise_run:
+                            print(f"---- Shall I continue and reattach this document? (Y/n)")
+                            rsp = input()
+                            if rsp.lower().strip() == "n":
+                                print(f"---- User skipping: {ref_name}")
+                                record_skip("user skipped", itm_name, ref_name, itm_lnk)
+                                continue
                 
-                if len(ref_j["files"]) > 1:
-                    if verbose: print(f"---- Skipping: {ref_name}, more than one file")
-                    skipped_docs["more than one file"].append({"item": itm_name, "document": ref_name, "item link": itm_lnk})
+                    if len(ref_j["files"]) > 1:
+                        if verbose: print(f"---- Skipping: {ref_name}, more than one file")
+                        record_skip("more than one file", itm_name, ref_name, itm_lnk)
                 
-                ref_file_name = ref_j["files"][0]["name"]
-                ref_name_escaped = ref_file_name.replace(".", "\\.").replace('"', '').replace("'", "")
-                reattached_docs[ref_id].append({
-                    "item": itm_name, 
-                    "document": ref_name, 
-                    "item link": itm_lnk,
-                    "ref vid": ref_vid,
-                    "ref name escaped": ref_name_escaped,
-                    "ref sec": ref_sec,
-                    "ref field id": ref_field_id,
-                    "ref file name": ref_file_name,
-                    "item id": itm_i,
-                    "item vid": itm_vid,
-                    "item tags": itm_j.get("tags", []),
-                    "doc tags": ref_j.get("tags", []),
-                    })
-                if verbose: print(f"---- Will reattach: {ref_name}")
-            except (subprocess.CalledProcessError, KeyError) as e:
-                if verbose: print(f"---- Skipping: {ref_name}, failed to check document: {e}")
-                failed_docs[f"failed to check document"].append({"item": itm_name, "document": ref_name, "item link": itm_lnk, "error": e})
-                continue
+                    ref_file_name = ref_j["files"][0]["name"]
+                    # dots separate section and field in op's assignment
+                    # syntax, so they still need escaping in the field name
+                    ref_name_escaped = ref_file_name.replace(".", "\\.")
+                    job = ReattachJob(
+                        item_name=itm_name,
+                        doc_name=ref_name,
+                        item_link=itm_lnk,
+                        ref_vid=ref_vid,
+                        ref_name_escaped=ref_name_escaped,
+                        ref_sec=ref_sec,
+                        ref_field_id=ref_field_id,
+                        ref_file_name=ref_file_name,
+                        item_id=itm_i,
+                        item_vid=itm_vid,
+                        item_tags=itm_j.get("tags", []),
+                        doc_tags=ref_j.get("tags", []),
+                        )
+                    reattached_docs[ref_id].append(job)
+                    work_q.put((ref_id, job))
+                    if verbose: print(f"---- Will reattach: {ref_name}")
+                except (subprocess.CalledProcessError, KeyError) as e:
+                    if verbose: print(f"---- Skipping: {ref_name}, failed to check document: {e}")
+                    record_fail("failed to check document", itm_name, ref_name, itm_lnk, e)
+                    continue
             
-    # Loop over each document that was found and reattach it
-    num_reattached_total = sum([len(v) for v in reattached_docs.values()])
-    
-    if num_reattached_total == 0:
-        print("No documents to reattach.")
-        return
-    
-    if dry_run: print("DRY RUN: No changes will be made.")
-    
-    if confirm_before_modifying:
-        # print a summary of the number of documents to be reattached and then
-        # ask the user if they want to reattach all documents.
-        print(f"Found {num_reattached_total} document{'' if num_reattached_total == 1 else 's'} to reattach.")
-        # print details of the reattachments
-        print("Reattaching:")
-        for ref_id, itm_dicts in reattached_docs.items():
-            for itm_dict in itm_dicts:
-                print(f"  '{itm_dict['document']}' to '{itm_dict['item']}'")
-        print("Shall I continue and reattach all documents? (Y/n)")
-        rsp = input()
-        if rsp.lower().strip() == "n":
-            print("Cancelling. No changes made.")
+        # Resolution is done; release (or cancel) the Step-2 consumers and
+        # wait for the queued reattachments to finish.
+        num_reattached_total = sum([len(v) for v in reattached_docs.values()])
+
+        if num_reattached_total == 0:
+            drain_step2()
+            report_file.close()
+            print("No documents to reattach.")
             return
-        
-    for ref_id, itm_dicts in tqdm(reattached_docs.items(), desc=f"(Step 2 of 2) Reattaching {num_reattached_total} documents"):
-        for itm_dict in itm_dicts:
-            ref_vid = itm_dict["ref vid"]
-            ref_name_escaped = itm_dict["ref name escaped"]
-            ref_sec = itm_dict["ref sec"]
-            ref_field_id = itm_dict["ref field id"]
-            itm_i = itm_dict["item id"]
-            itm_vid = itm_dict["item vid"]
-            itm_name = itm_dict["item"]
-            ref_name = itm_dict["document"]
-            ref_file_name = itm_dict["ref file name"]
-            itm_lnk = itm_dict["item link"]
-            itm_tags = itm_dict["item tags"]
-            doc_tags = itm_dict["doc tags"]
-            if verbose: print(f"-- Reattaching '{ref_name}' to '{itm_name}'")
-            try:
-                with tempfile.TemporaryDirectory() as tmp_dir:
-                    out_file = os.path.join(tmp_dir, ref_file_name.replace(" ", "_").replace('"', '').replace("'", ""))
-                    if verbose: print(f"---- copying file to temp dir: {out_file}")
-                    R(f"document get {ref_id} --vault {ref_vid} --out-file '{out_file}'")
-                    
-                    if verbose: print(f"---- attaching file to item")
-                    R(f"item edit {itm_i} --vault {itm_vid} {dry_run_str} '{ref_name_escaped}[file]={out_file}'")
-                    
-                    if reattached_tag != "":
-                        if verbose: print(f"---- adding reattached tag to item")
-                        if reattached_tag not in itm_tags:
-                            itm_tags.append(reattached_tag)
-                            itm_tags = ','.join([f'"{t}"' for t in itm_tags])
-                            R(f"item edit {itm_i} --vault {itm_vid} {dry_run_str} --tags {itm_tags}")
-                    
-                    if verbose: print(f"---- deleting document reference")
-                    R(f"item edit {itm_i} --vault {itm_vid} {dry_run_str} '{ref_sec}.{ref_field_id}[delete]'")
-                    
-                    if verbose: print(f"---- tagging document before deletion")
-                    if reattached_tag + " deleted" not in doc_tags:
-                        doc_tags.append(reattached_tag + " deleted")
-                        doc_tags = ','.join([f'"{t}"' for t in doc_tags])
-                        R(f"item edit {ref_id} --vault {ref_vid} {dry_run_str} --tags {doc_tags}")
-                    
-                    if verbose: print(f"---- deleting document")
-                    if not dry_run:
-                        R(f"item delete {ref_id} --vault {ref_vid} {archive_str}")
-            except (subprocess.CalledProcessError, KeyError) as e:
-                if verbose: print(f"---- Skipping: {ref_name} to {itm_name}, failed to reattach document: {e}")
-                failed_docs[f"failed to reattach document"].append({"item": itm_name, "document": ref_name, "item link": itm_lnk, "error": e})
-    # make reattached_docs a list of dicts instead of a dict of lists of dicts
-    reattached_docs = [doc for docs in reattached_docs.values() for doc in docs]
+
+        if dry_run: print("DRY RUN: No changes will be made.")
+
+        if confirm_before_modifying:
+            # print a summary of the number of documents to be reattached and then
+            # ask the user if they want to reattach all documents.
+            print(f"Found {num_reattached_total} document{'' if num_reattached_total == 1 else 's'} to reattach.")
+            # print details of the reattachments
+            print("Reattaching:")
+            for ref_id, jobs in reattached_docs.items():
+                for job in jobs:
+                    print(f"  '{job.doc_name}' to '{job.item_name}'")
+            print("Shall I continue and reattach all documents? (Y/n)")
+            rsp = input()
+            if rsp.lower().strip() == "n":
+                drain_step2(cancel=True)
+                report_file.close()
+                print("Cancelling. No changes made.")
+                return
+        drain_step2()
+    finally:
+        drain_step2(cancel=True)
+    # make reattached_docs a flat list of jobs instead of a dict of lists
+    reattached_docs = [job for jobs in reattached_docs.values() for job in jobs]
     
     # Print report of reattached, skipped, and failed documents.
     # First print a summary of the number of each type of document.
@@ -739,50 +1366,44 @@ def main(dry_run=DRY_RUN,
     # reason (dict key).
 
     if dry_run: print("DRY RUN: No changes were made.")
-    reattached_item_names = list(set([doc["item"] for doc in reattached_docs]))
-    num_skipped = sum([len(v) for v in skipped_docs.values()])
-    num_failed = sum([len(v) for v in failed_docs.values()])
+    reattached_item_names = list(set([job.item_name for job in reattached_docs]))
+    num_skipped = sum(skipped_counts.values())
+    num_failed = sum(failed_counts.values())
     print(f"Reattached {len(reattached_docs)} documents to {len(reattached_item_names)} items.")
     if num_skipped > 0:
         print(f"Skipped {num_skipped} documents because")
-        for k,v in skipped_docs.items():
-            print(f"  {k}: {len(v)}")
-    if len(failed_docs) > 0:
+        for k,v in skipped_counts.items():
+            print(f"  {k}: {v}")
+    if num_failed > 0:
         print(f"Failed to reattach {num_failed} documents because")
-        for k,v in failed_docs.items():
-            print(f"  {k}: {len(v)}")
+        for k,v in failed_counts.items():
+            print(f"  {k}: {v}")
 
-    # Print the details for skipped and failed documents.
-    if verbose and len(skipped_docs) > 0:
-        print("")
-        print("Skipped documents:")
-        for k,v in skipped_docs.items():
-            print(f"  Reason: {k}")
-            doc_list_str = ', '.join([f"{doc['item']}" + (f" - {doc['document']}" if doc['document'] != "" else "") for doc in v])
-            print(f"    {doc_list_str}")
-    if verbose and len(failed_docs) > 0:
-        print("")
-        print("Failed documents:")
-        for k,v in failed_docs.items():
-            print(f"  Problem: {k}")
-            doc_list_str = ', '.join([f"{doc['item']}" + (f" - {doc['document']}" if doc['document'] != "" else "") for doc in v])
-            print(f"    {doc_list_str}")
-            
-    # Print a full report to a csv file, 1password_document_reattacher_report_{current_date_time}.csv in the current directory
-    current_date_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    with open(f"1password_document_reattacher_report_{current_date_time}.csv", "w") as f:
-        writer = csv.writer(f)
-        writer.writerow(["item", "document", "item link", "status"])
-        for doc in reattached_docs:
-            writer.writerow([doc["item"], doc["document"], doc["item link"], "reattached"])
-        for k,v in skipped_docs.items():
-            for doc in v:
-                writer.writerow([doc["item"], doc["document"], doc["item link"], f"skipped: {k}"])
-        for k,v in failed_docs.items():
-            for doc in v:
-                writer.writerow([doc["item"], doc["document"], doc["item link"], f"error: {doc['error']}"])    
-    
-    print(f"Done. Report written to {os.path.join(os.getcwd(), '1password_document_reattacher.csv')}")
+    # Print the details for skipped and failed documents, unless there
+    # are so many that joining the names would swamp the terminal; the
+    # CSV report has every row either way.
+    if verbose and num_skipped + num_failed > 500:
+        print(f"(Skipping the per-reason name listing for {num_skipped + num_failed} documents; see the report.)")
+    elif verbose:
+        if len(skipped_details) > 0:
+            print("")
+            print("Skipped documents:")
+            for k,v in skipped_details.items():
+                print(f"  Reason: {k}")
+                print(f"    {', '.join(v)}")
+        if len(failed_details) > 0:
+            print("")
+            print("Failed documents:")
+            for k,v in failed_details.items():
+                print(f"  Problem: {k}")
+                print(f"    {', '.join(v)}")
+
+    # The skip and failure rows streamed out as they happened; finish the
+    # report with the reattached rows and close it.
+    report_writer.writerows([job.item_name, job.doc_name, job.item_link, "reattached"] for job in reattached_docs)
+    report_file.close()
+
+    print(f"Done. Report written to {os.path.join(os.getcwd(), report_path)}")
 
 if __name__ == "__main__":
     # define command line arguments
@@ -809,58 +1430,43 @@ A report of the changes will be saved to a csv file in the current directory."""
     parser.add_argument("--op-cli-path", help="The path to the op command line tool.", default=OP_CLI_PATH)
     parser.add_argument("--generate-share-links", action="store_true", help="Generate share links for items and documents to aid in checking/supervising and that appear in the report.")
     parser.add_argument("--reattach-tag", help="The tag to add to items that have documents reattached.", default="linked docs reattached")
+    parser.add_argument("--stats", action="store_true", help="Print the vault statistics (items by vault, category, and tag) before processing.")
+    parser.add_argument("--max-workers", type=int, default=MAX_WORKERS, help="How many op calls may run concurrently for fetches; pools that modify items run at half this.")
+    parser.add_argument("--cache-items", action="store_true", help="Cache fetched item data on disk (in .op_item_cache in the current directory) so a later run, e.g. a real run after a dry run, doesn't refetch unchanged items. The cache file is unencrypted, but concealed field values (passwords etc.) are stripped before anything is written to it; only titles, tags, file names and document references are stored.")
     parser.add_argument("--cleanup-documents", action="store_true", help="Instead of reattaching documents based on explicit links between items, clean up standalone (single-file) document items that were not reattached when running the script normally without this option. Cleans us documents whose linking items are missing/archived/deleted, whose files are missing, or that appear to have been created during the 1P v7 upgrade base on their name.")
     
     # parse command line arguments
     args = parser.parse_args()
 
+    if args.max_workers > 0:
+        MAX_WORKERS = args.max_workers
+
+    if args.cache_items:
+        enable_disk_item_cache()
+
+    # main and cleanup_documents take the same options; marshal them once
+    common_kwargs = dict(dry_run=args.dry_run,
+        archive_docs=not args.delete_docs,
+        supervise_run=args.supervise,
+        confirm_before_modifying=args.confirm_before_modifying,
+        verbose=args.verbose,
+        item_whitelist=args.item_whitelist if args.item_whitelist is not None else [],
+        item_blacklist=args.item_blacklist if args.item_blacklist is not None else [],
+        doc_whitelist=args.doc_whitelist if args.doc_whitelist is not None else [],
+        doc_blacklist=args.doc_blacklist if args.doc_blacklist is not None else [],
+        tag_whitelist=args.tag_whitelist if args.tag_whitelist is not None else [],
+        tag_blacklist=args.tag_blacklist if args.tag_blacklist is not None else [],
+        op_cli_path=args.op_cli_path,
+        generate_share_links=args.generate_share_links,
+        reattached_tag=args.reattach_tag)
+
     if args.cleanup_documents:
-        cleanup_documents(dry_run=args.dry_run,
-            archive_docs=not args.delete_docs,
-            supervise_run=args.supervise,
-            confirm_before_modifying=args.confirm_before_modifying,
-            verbose=args.verbose,
-            item_whitelist=args.item_whitelist if args.item_whitelist is not None else [],
-            item_blacklist=args.item_blacklist if args.item_blacklist is not None else [],
-            doc_whitelist=args.doc_whitelist if args.doc_whitelist is not None else [],
-            doc_blacklist=args.doc_blacklist if args.doc_blacklist is not None else [],
-            tag_whitelist=args.tag_whitelist if args.tag_whitelist is not None else [],
-            tag_blacklist=args.tag_blacklist if args.tag_blacklist is not None else [],
-            op_cli_path=args.op_cli_path,
-            generate_share_links=args.generate_share_links,
-            reattached_tag=args.reattach_tag)
+        cleanup_documents(**common_kwargs)
     else:
-        main(dry_run=args.dry_run, 
-            archive_docs=not args.delete_docs, 
-            supervise_run=args.supervise,
-            confirm_before_modifying=args.confirm_before_modifying,
-            verbose=args.verbose, 
-            item_whitelist=args.item_whitelist if args.item_whitelist is not None else [],
-            item_blacklist=args.item_blacklist if args.item_blacklist is not None else [],
-            doc_whitelist=args.doc_whitelist if args.doc_whitelist is not None else [],
-            doc_blacklist=args.doc_blacklist if args.doc_blacklist is not None else [],
-            tag_whitelist=args.tag_whitelist if args.tag_whitelist is not None else [],
-            tag_blacklist=args.tag_blacklist if args.tag_blacklist is not None else [],
-            op_cli_path=args.op_cli_path,
-            generate_share_links=args.generate_share_links,
-            reattached_tag=args.reattach_tag)
-        
+        main(stats=args.stats, **common_kwargs)
+
         # ask user if they want to followup with cleanup_documents
         print("Would you like to follow up with additional cleaning up of 1P v7 documents? (Y/n)")
         rsp = input()
         if rsp.lower().strip() != "n":
-            cleanup_documents(dry_run=args.dry_run,
-                archive_docs=not args.delete_docs,
-                supervise_run=args.supervise,
-                confirm_before_modifying=args.confirm_before_modifying,
-                verbose=args.verbose,
-                item_whitelist=args.item_whitelist if args.item_whitelist is not None else [],
-                item_blacklist=args.item_blacklist if args.item_blacklist is not None else [],
-                doc_whitelist=args.doc_whitelist if args.doc_whitelist is not None else [],
-                doc_blacklist=args.doc_blacklist if args.doc_blacklist is not None else [],
-                tag_whitelist=args.tag_whitelist if args.tag_whitelist is not None else [],
-                tag_blacklist=args.tag_blacklist if args.tag_blacklist is not None else [],
-                op_cli_path=args.op_cli_path,
-                generate_share_links=args.generate_share_links,
-                reattached_tag=args.reattach_tag)
-        
\ No newline at end of file
+            cleanup_documents(**common_kwargs)